@@ -2,6 +2,7 @@
 const Order = require('../models/Order');
 const Cart = require('../models/Cart');
 const Product = require('../models/Product');
+const { recordEvents } = require('../services/mlService');
 
 // Create order from cart
 exports.createOrder = async(req, res, next) => {
@@ -32,6 +33,7 @@ exports.createOrder = async(req, res, next) => {
         // Calculate total and prepare order items
         let totalAmount = 0;
         const orderItems = [];
+        const mlEvents = [];
 
         // Validate products and stock based on itemsToProcess
         for (const item of itemsToProcess) {
@@ -54,6 +56,14 @@ exports.createOrder = async(req, res, next) => {
                 quantity: item.quantity,
                 price: product.price,
             });
+
+            if (product.mlProductId) {
+                mlEvents.push({
+                    productId: product.mlProductId,
+                    type: 'order',
+                    quantity: item.quantity,
+                });
+            }
         }
 
         // Create order
@@ -67,6 +77,9 @@ exports.createOrder = async(req, res, next) => {
 
         await order.save();
 
+        // Feed popularity ranking for cold-start recommendations
+        recordEvents(mlEvents);
+
         // Clear cart
         await Cart.findOneAndUpdate({ userId }, { items: [] });
 
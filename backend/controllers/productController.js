@@ -1,5 +1,6 @@
 // Product Controller
 const Product = require('../models/Product');
+const { recordEvents } = require('../services/mlService');
 const path = require('path');
 const fs = require('fs');
 
@@ -108,6 +109,11 @@ exports.getProduct = async(req, res, next) => {
             return res.status(404).json({ message: 'Product not found' });
         }
 
+        // Only products linked to the ML catalog feed popularity ranking
+        if (product.mlProductId) {
+            recordEvents([{ productId: product.mlProductId, type: 'view' }]);
+        }
+
         res.status(200).json({
             message: 'Product retrieved',
             product,
@@ -57,6 +57,11 @@ const productSchema = new mongoose.Schema({
         type: mongoose.Schema.Types.ObjectId,
         ref: 'User',
     },
+    // Matching productId in the ML service catalog (ml-service/data/products.json)
+    mlProductId: {
+        type: String,
+        default: null,
+    },
 }, { timestamps: true });
 
 module.exports = mongoose.model('Product', productSchema);
\ No newline at end of file
@@ -3,6 +3,12 @@ require('dotenv').config();
 const mongoose = require('mongoose');
 const Product = require('../models/Product');
 const connectDB = require('../config/db');
+const mlCatalog = require('../../ml-service/data/products.json');
+
+// Map "category:name" to ML catalog IDs so events can be sent to the ML service
+const mlProductIds = new Map(
+    mlCatalog.products.map(p => [`${p.category}:${p.name}`, p.productId])
+);
 
 // Generate image URLs using Unsplash Source with keywords derived from product name and category
 // This returns images that are much more likely to match the product (e.g., 'coconut oil' → coconut/oil photos)
@@ -192,6 +198,7 @@ const generateProducts = () => {
                 stock: item.stock,
                 imageUrl: generateImageUrl(item.name, category),
                 rating: Math.floor(Math.random() * 2) + 4,
+                mlProductId: mlProductIds.get(`${category}:${item.name}`) || null,
             });
         });
     }
@@ -211,6 +218,8 @@ const seedDatabase = async() => {
         const sampleProducts = generateProducts();
         const createdProducts = await Product.insertMany(sampleProducts);
         console.log(`✓ Created ${createdProducts.length} sample products with images`);
+        const mappedCount = createdProducts.filter(p => p.mlProductId).length;
+        console.log(`✓ Linked ${mappedCount} products to the ML catalog`);
 
         // Summary by category
         console.log('\n📦 Products by Category:');
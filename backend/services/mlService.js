@@ -7,6 +7,8 @@ const axios = require('axios');
 
 const ML_URL = process.env.ML_SERVICE_URL || 'http://localhost:8000';
 const ML_TIMEOUT = 30000; // 30 seconds
+// Budget sent to the ML service so it returns partial results before we time out
+const ML_DEADLINE = ML_TIMEOUT - 2000;
 
 // Create axios instance for ML service
 const mlClient = axios.create({
@@ -14,6 +16,7 @@ const mlClient = axios.create({
     timeout: ML_TIMEOUT,
     headers: {
         'Content-Type': 'application/json',
+        'X-Deadline-Ms': String(ML_DEADLINE),
     },
 });
 
@@ -71,7 +74,10 @@ async function searchByImage(imageBuffer, topK = 5) {
         form.append('top_k', topK.toString());
 
         const response = await axios.post(`${ML_URL}/image-search`, form, {
-            headers: form.getHeaders(),
+            headers: {
+                ...form.getHeaders(),
+                'X-Deadline-Ms': String(ML_DEADLINE),
+            },
             timeout: ML_TIMEOUT,
         });
         return response.data;
@@ -124,6 +130,21 @@ async function getProductDetails(productId) {
     }
 }
 
+/**
+ * Record order/view events for popularity-based recommendations.
+ * Fire-and-forget: failures are logged and never reach the caller.
+ * @param {Array} events - Events like { productId, type: 'order'|'view', quantity }
+ */
+function recordEvents(events) {
+    if (!events || events.length === 0) {
+        return;
+    }
+
+    mlClient.post('/events', { events }).catch((error) => {
+        console.error('Error recording ML events:', error.message);
+    });
+}
+
 module.exports = {
     getUserRecommendations,
     getSimilarProducts,
@@ -131,4 +152,5 @@ module.exports = {
     checkHealth,
     getProductCount,
     getProductDetails,
+    recordEvents,
 };
\ No newline at end of file
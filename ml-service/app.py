@@ -3,14 +3,40 @@ FastAPI ML Service for E-Commerce
 Provides recommendation and image-based search APIs
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
+from fastapi import (
+    FastAPI, File, UploadFile, HTTPException, Header, Request, Response
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal, Optional
+import asyncio
+import functools
+import hmac
 import os
 import json
 from models.recommender import ProductRecommender
 from models.image_search import ImageSearchEngine
+from models.popularity import is_valid_timestamp
+from utils.deadline import Deadline
+from utils.job_runner import EmbeddingJobRunner
+from utils.profiler import (
+    sample_stacks, current_request_profile, RequestProfilingMiddleware
+)
+
+
+# Seconds between client-disconnect checks while a scan is running
+DISCONNECT_POLL_INTERVAL = 0.05
+
+# Token for admin endpoints; admin features are disabled when unset
+ADMIN_TOKEN = os.environ.get("ML_ADMIN_TOKEN")
+
+# Longest sampling session allowed on a live worker
+MAX_PROFILE_SECONDS = 60
+
+# Compute threads given to background embedding builds
+EMBEDDING_BUILD_THREADS = int(os.environ.get("EMBEDDING_BUILD_THREADS", "1"))
 
 
 # ============= Pydantic Models =============
@@ -35,6 +61,27 @@ class SimilarProductRequest(BaseModel):
     top_k: int = Field(default=10, ge=1, le=50)
 
 
+class ProductEvent(BaseModel):
+    """Order or view event for popularity ranking"""
+    productId: str
+    type: Literal["order", "view"]
+    timestamp: Optional[float] = None
+    quantity: int = Field(default=1, ge=1)
+    
+    @field_validator("timestamp")
+    @classmethod
+    def check_timestamp(cls, value: Optional[float]) -> Optional[float]:
+        """Reject timestamps in the future or too far in the past."""
+        if value is not None and not is_valid_timestamp(value):
+            raise ValueError("timestamp must be recent, in seconds since the epoch")
+        return value
+
+
+class ProductEventsRequest(BaseModel):
+    """Batch of product events"""
+    events: List[ProductEvent] = Field(default_factory=list, max_length=1000)
+
+
 class RecommendationResponse(BaseModel):
     """Single recommendation"""
     productId: str
@@ -59,6 +106,17 @@ class ImageSearchResponse(BaseModel):
     similarity: float
 
 
+class EmbeddingJobResponse(BaseModel):
+    """Embedding build job status"""
+    jobId: str
+    status: str
+    processed: int
+    total: int
+    error: Optional[str] = None
+    startedAt: float
+    finishedAt: Optional[float] = None
+
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
@@ -82,6 +140,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+def is_admin(token: Optional[str]) -> bool:
+    """Check an admin token against ML_ADMIN_TOKEN."""
+    if not ADMIN_TOKEN or not token:
+        return False
+    # Compare bytes: compare_digest rejects non-ASCII str arguments
+    return hmac.compare_digest(token.encode("latin-1", "replace"), ADMIN_TOKEN.encode())
+
+
+# Per-request profiling is only wired in when admin access is configured,
+# so normal deployments pay nothing for it
+if ADMIN_TOKEN:
+    app.add_middleware(RequestProfilingMiddleware, is_authorized=is_admin)
+
+
 # Initialize ML models
 try:
     recommender = ProductRecommender("data/products.json")
@@ -92,6 +165,49 @@ except Exception as e:
     image_search = None
 
 
+def load_built_embeddings():
+    """
+    Hot-load a finished embedding build into the image search engine.
+    Other workers pick up the new store on their next image search.
+    """
+    if image_search:
+        image_search.reload_embeddings()
+
+
+embedding_jobs = EmbeddingJobRunner(
+    "build_embeddings.py",
+    threads=EMBEDDING_BUILD_THREADS,
+    on_complete=load_built_embeddings
+)
+
+
+# ============= Deadline Helpers =============
+
+async def run_with_deadline(request: Request, response: Response,
+                            deadline: Deadline, func, *args, **kwargs):
+    """
+    Run a blocking scan in the threadpool under a deadline.
+    Cancels the deadline if the client disconnects, and flags the
+    response with X-Partial-Results when the scan stopped early.
+    """
+    profile = current_request_profile()
+    if profile is not None:
+        func = functools.partial(profile.run, func)
+    
+    task = asyncio.ensure_future(
+        run_in_threadpool(func, *args, deadline=deadline, **kwargs)
+    )
+    while not task.done():
+        await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if not task.done() and await request.is_disconnected():
+            deadline.cancel()
+    
+    results = task.result()
+    if deadline.tripped:
+        response.headers["X-Partial-Results"] = "true"
+    return results
+
+
 # ============= Health Check =============
 
 @app.get("/health", response_model=HealthResponse)
@@ -106,12 +222,18 @@ async def health_check():
 # ============= Recommendation Endpoints =============
 
 @app.post("/recommend/user", response_model=List[RecommendationResponse])
-async def recommend_for_user(request: UserRecommendationRequest):
+async def recommend_for_user(
+    request: UserRecommendationRequest,
+    http_request: Request,
+    response: Response,
+    x_deadline_ms: Optional[str] = Header(default=None)
+):
     """
     Get product recommendations for a user based on their history.
     
     Args:
         request: User ID and purchase history
+        x_deadline_ms: Optional latency budget in milliseconds
         
     Returns:
         List of recommended products with scores
@@ -130,7 +252,11 @@ async def recommend_for_user(request: UserRecommendationRequest):
             for item in request.user_history
         ]
         
-        recommendations = recommender.recommend_for_user(history, request.top_k)
+        deadline = Deadline.from_header(x_deadline_ms)
+        recommendations = await run_with_deadline(
+            http_request, response, deadline,
+            recommender.recommend_for_user, history, request.top_k
+        )
         return recommendations
     
     except Exception as e:
@@ -138,13 +264,19 @@ async def recommend_for_user(request: UserRecommendationRequest):
 
 
 @app.post("/recommend/similar-products", response_model=List[SimilarProductResponse])
-async def recommend_similar_products(request: SimilarProductRequest):
+async def recommend_similar_products(
+    request: SimilarProductRequest,
+    http_request: Request,
+    response: Response,
+    x_deadline_ms: Optional[str] = Header(default=None)
+):
     """
     Get similar products based on a target product.
     Similarity based on category and price.
     
     Args:
         request: Product ID
+        x_deadline_ms: Optional latency budget in milliseconds
         
     Returns:
         List of similar products with similarity scores
@@ -161,7 +293,10 @@ async def recommend_similar_products(request: SimilarProductRequest):
                 detail=f"Product {request.productId} not found"
             )
         
-        similarities = recommender.recommend_similar_products(
+        deadline = Deadline.from_header(x_deadline_ms)
+        similarities = await run_with_deadline(
+            http_request, response, deadline,
+            recommender.recommend_similar_products,
             request.productId,
             request.top_k
         )
@@ -173,10 +308,48 @@ async def recommend_similar_products(request: SimilarProductRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============= Event Ingestion Endpoint =============
+
+@app.post("/events")
+async def record_events(request: ProductEventsRequest):
+    """
+    Record order and view events for popularity-based recommendations.
+    
+    Args:
+        request: Batch of events; timestamps are seconds since the epoch
+        
+    Returns:
+        Number of events recorded and skipped (for unknown products)
+    """
+    if not recommender:
+        raise HTTPException(status_code=500, detail="Recommender not initialized")
+    
+    recorded = 0
+    skipped = []
+    for event in request.events:
+        if recommender.popularity.record_event(
+            event.productId, event.type, event.timestamp, event.quantity
+        ):
+            recorded += 1
+        else:
+            skipped.append(event.productId)
+    
+    if skipped:
+        print(f"Warning: Skipped {len(skipped)} events for unknown products: {skipped[:5]}")
+    
+    return {"recorded": recorded, "skipped": len(skipped)}
+
+
 # ============= Image Search Endpoint =============
 
 @app.post("/image-search", response_model=List[ImageSearchResponse])
-async def search_by_image(file: UploadFile = File(...), top_k: int = 5):
+async def search_by_image(
+    http_request: Request,
+    response: Response,
+    file: UploadFile = File(...),
+    top_k: int = 5,
+    x_deadline_ms: Optional[str] = Header(default=None)
+):
     """
     Find similar products by uploading an image.
     Uses CNN embeddings and cosine similarity.
@@ -184,6 +357,7 @@ async def search_by_image(file: UploadFile = File(...), top_k: int = 5):
     Args:
         file: Image file (PNG, JPEG, etc.)
         top_k: Number of results to return
+        x_deadline_ms: Optional latency budget in milliseconds
         
     Returns:
         List of similar products with similarity scores
@@ -194,12 +368,17 @@ async def search_by_image(file: UploadFile = File(...), top_k: int = 5):
     if top_k < 1 or top_k > 50:
         raise HTTPException(status_code=400, detail="top_k must be between 1 and 50")
     
+    deadline = Deadline.from_header(x_deadline_ms)
+    
     try:
         # Read image file
         contents = await file.read()
         
         # Search for similar products
-        results = image_search.search_by_image(contents, top_k)
+        results = await run_with_deadline(
+            http_request, response, deadline,
+            image_search.search_by_image, contents, top_k
+        )
         
         return results
     
@@ -233,22 +412,82 @@ async def get_product(product_id: str):
 # ============= Initialization Endpoint =============
 
 @app.post("/init/embeddings")
-async def init_embeddings(background_tasks: BackgroundTasks):
+async def init_embeddings():
     """
     Build embeddings for all products.
-    Runs in background to avoid blocking.
+    Runs in a separate low-priority process to avoid slowing down serving;
+    the finished store is loaded into image search automatically.
     """
     try:
-        # Import here to avoid circular imports
-        from build_embeddings import build_embeddings
-        
-        background_tasks.add_task(build_embeddings)
-        return {"message": "Embedding generation started in background"}
+        job = embedding_jobs.start()
+        return {
+            "message": "Embedding generation started in background",
+            "jobId": job.job_id
+        }
     
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/init/embeddings/jobs/{job_id}", response_model=EmbeddingJobResponse)
+async def embedding_job_status(job_id: str):
+    """Get status and progress of an embedding build."""
+    job = embedding_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
+
+@app.post("/init/embeddings/jobs/{job_id}/cancel", response_model=EmbeddingJobResponse)
+async def cancel_embedding_job(job_id: str):
+    """Cancel a running embedding build."""
+    job = embedding_jobs.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
+
+# ============= Admin Endpoints =============
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = 10,
+    interval_ms: float = 10,
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    Run a sampling profiler on this worker.
+    
+    Args:
+        seconds: How long to sample for
+        interval_ms: Milliseconds between samples
+        x_admin_token: Admin token matching ML_ADMIN_TOKEN
+        
+    Returns:
+        Collapsed stacks for flamegraph.pl or speedscope
+    """
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if seconds <= 0 or seconds > MAX_PROFILE_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be between 0 and {MAX_PROFILE_SECONDS}"
+        )
+    
+    if interval_ms < 1 or interval_ms > 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    
+    try:
+        return await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000.0)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 # ============= Root Endpoint =============
 
 @app.get("/")
@@ -264,11 +503,19 @@ async def root():
                 "similar_products": "/recommend/similar-products (POST)"
             },
             "image_search": "/image-search (POST)",
+            "events": "/events (POST)",
             "products": {
                 "count": "/products/count (GET)",
                 "detail": "/products/{product_id} (GET)"
             },
-            "initialization": "/init/embeddings (POST)"
+            "initialization": {
+                "build": "/init/embeddings (POST)",
+                "status": "/init/embeddings/jobs/{job_id} (GET)",
+                "cancel": "/init/embeddings/jobs/{job_id}/cancel (POST)"
+            },
+            "admin": {
+                "profile": "/admin/profile (GET)"
+            }
         }
     }
 
@@ -3,6 +3,7 @@ Build embeddings for all products from their images.
 Runs once to generate and cache embeddings.
 """
 
+import argparse
 import json
 import numpy as np
 import requests
@@ -28,10 +29,16 @@ def download_image(url: str) -> Image.Image:
     return Image.new('RGB', (224, 224), color=(73, 109, 137))
 
 
-def build_embeddings():
+def build_embeddings(embeddings_file: str = "data/image_embeddings.npy",
+                     product_ids_file: str = "data/product_ids.npy",
+                     tmp_embeddings_file: str = None,
+                     tmp_product_ids_file: str = None):
     """
     Build embeddings for all products.
     Saves to data/image_embeddings.npy and data/product_ids.npy
+    
+    Files are written to temporary paths first and then moved into place,
+    so a cancelled build never leaves a half-written store behind.
     """
     print("Building product embeddings...")
     
@@ -57,14 +64,42 @@ def build_embeddings():
         search_engine.add_product_embedding(product["productId"], embedding)
     
     # Save embeddings
-    embeddings_file = "data/image_embeddings.npy"
-    product_ids_file = "data/product_ids.npy"
+    tmp_embeddings_file = tmp_embeddings_file or embeddings_file.replace(".npy", ".tmp.npy")
+    tmp_product_ids_file = tmp_product_ids_file or product_ids_file.replace(".npy", ".tmp.npy")
     
-    search_engine.save_embeddings(embeddings_file, product_ids_file)
+    search_engine.save_embeddings(tmp_embeddings_file, tmp_product_ids_file)
+    # Embeddings go last: workers reload when the embeddings file changes,
+    # and reject a store whose two files have different lengths
+    os.replace(tmp_product_ids_file, product_ids_file)
+    os.replace(tmp_embeddings_file, embeddings_file)
     
     print(f"✓ Saved {len(products)} embeddings to {embeddings_file}")
     print(f"✓ Saved product IDs to {product_ids_file}")
 
 
 if __name__ == "__main__":
-    build_embeddings()
+    parser = argparse.ArgumentParser(description="Build product image embeddings")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Maximum number of compute threads")
+    parser.add_argument("--nice", type=int, default=0,
+                        help="Lower process priority by this amount (POSIX only)")
+    parser.add_argument("--embeddings-file", default="data/image_embeddings.npy")
+    parser.add_argument("--product-ids-file", default="data/product_ids.npy")
+    parser.add_argument("--tmp-embeddings-file", default=None,
+                        help="Temporary path for embeddings before moving into place")
+    parser.add_argument("--tmp-product-ids-file", default=None,
+                        help="Temporary path for product IDs before moving into place")
+    args = parser.parse_args()
+    
+    if args.nice and hasattr(os, "nice"):
+        os.nice(args.nice)
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+    
+    build_embeddings(
+        args.embeddings_file,
+        args.product_ids_file,
+        args.tmp_embeddings_file,
+        args.tmp_product_ids_file
+    )
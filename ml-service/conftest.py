@@ -0,0 +1,29 @@
+"""
+Pytest configuration.
+Keeps the ml-service directory on sys.path so tests import modules the
+same way app.py does (e.g. `from models.recommender import ...`).
+"""
+
+import pytest
+
+from utils.deadline import Deadline
+
+
+class CountdownDeadline(Deadline):
+    """Deadline that expires after a fixed number of checks."""
+
+    def __init__(self, checks: int):
+        super().__init__()
+        self.checks = checks
+
+    def expired(self) -> bool:
+        if self.checks <= 0:
+            self.tripped = True
+        self.checks -= 1
+        return self.tripped
+
+
+@pytest.fixture
+def countdown_deadline():
+    """Factory for deadlines that expire after a number of checks."""
+    return CountdownDeadline
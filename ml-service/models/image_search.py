@@ -9,9 +9,15 @@ import torchvision.transforms as transforms
 from torchvision.models import resnet50
 from PIL import Image
 import io
+import threading
 from sklearn.metrics.pairwise import cosine_similarity
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 import os
+from utils.deadline import Deadline
+
+
+# Number of embeddings compared per step; deadlines are checked between chunks
+SCAN_CHUNK_SIZE = 1024
 
 
 class ImageSearchEngine:
@@ -23,8 +29,12 @@ class ImageSearchEngine:
         self.transform = self._get_transforms()
         
         # Load embeddings and product IDs
+        self.embeddings_file = embeddings_file
+        self.product_ids_file = product_ids_file
         self.embeddings = None
         self.product_ids = None
+        self._store_mtime = None
+        self._store_lock = threading.Lock()
         self._load_embeddings(embeddings_file, product_ids_file)
     
     def _load_model(self):
@@ -56,8 +66,10 @@ class ImageSearchEngine:
         """Load pre-computed embeddings and product IDs."""
         try:
             if os.path.exists(embeddings_file) and os.path.exists(product_ids_file):
-                self.embeddings = np.load(embeddings_file)
-                self.product_ids = np.load(product_ids_file, allow_pickle=True)
+                self._store_mtime = self._file_mtime(embeddings_file)
+                self.embeddings, self.product_ids = self._read_store(
+                    embeddings_file, product_ids_file
+                )
             else:
                 print(f"Warning: Embedding files not found. Will initialize empty.")
                 self.embeddings = np.array([]).reshape(0, 2048)
@@ -67,6 +79,63 @@ class ImageSearchEngine:
             self.embeddings = np.array([]).reshape(0, 2048)
             self.product_ids = np.array([])
     
+    @staticmethod
+    def _file_mtime(path: str):
+        """Get a file's modification time, or None if it does not exist."""
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+    
+    @staticmethod
+    def _read_store(embeddings_file: str, product_ids_file: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Read embeddings and product IDs from disk.
+        
+        Raises:
+            ValueError: If the files do not describe the same products,
+                e.g. when read in the middle of a rebuild
+        """
+        embeddings = np.load(embeddings_file)
+        product_ids = np.load(product_ids_file, allow_pickle=True)
+        if len(embeddings) != len(product_ids):
+            raise ValueError(
+                f"{len(embeddings)} embeddings but {len(product_ids)} product IDs"
+            )
+        return embeddings, product_ids
+    
+    def reload_embeddings(self, embeddings_file: str = None, product_ids_file: str = None):
+        """
+        Swap in a freshly built embedding store without restarting.
+        Searches already in progress keep using the previous store.
+        """
+        embeddings_file = embeddings_file or self.embeddings_file
+        product_ids_file = product_ids_file or self.product_ids_file
+        
+        mtime = self._file_mtime(embeddings_file)
+        embeddings, product_ids = self._read_store(embeddings_file, product_ids_file)
+        with self._store_lock:
+            self.embeddings = embeddings
+            self.product_ids = product_ids
+            self._store_mtime = mtime
+    
+    def _reload_if_changed(self):
+        """
+        Reload the store if another process rebuilt it.
+        Builds replace the embeddings file last, so its mtime marks a
+        complete store.
+        """
+        mtime = self._file_mtime(self.embeddings_file)
+        if mtime is None or mtime == self._store_mtime:
+            return
+        
+        try:
+            self.reload_embeddings()
+        except Exception as e:
+            print(f"Warning: Could not reload embeddings: {e}")
+            # Keep serving the current store; retry when the file changes again
+            self._store_mtime = mtime
+    
     def get_image_embedding(self, image) -> np.ndarray:
         """
         Generate embedding for an image.
@@ -97,28 +166,51 @@ class ImageSearchEngine:
         
         return embedding
     
-    def search_by_image(self, image, top_k: int = 5) -> List[Dict]:
+    def search_by_image(
+        self,
+        image,
+        top_k: int = 5,
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict]:
         """
         Find similar products by image.
         
         Args:
             image: PIL Image or bytes
             top_k: Number of similar products to return
+            deadline: Optional budget; best results so far are returned
+                when it expires
             
         Returns:
             List of similar products with similarity scores
         """
-        if self.embeddings is None or len(self.embeddings) == 0:
+        self._reload_if_changed()
+        with self._store_lock:
+            embeddings, product_ids = self.embeddings, self.product_ids
+        
+        if embeddings is None or len(embeddings) == 0:
+            return []
+        
+        # Skip inference entirely if the budget is already spent
+        if deadline is not None and deadline.expired():
             return []
         
         # Get query embedding
         query_embedding = self.get_image_embedding(image)
         
-        # Compute similarities with all products
-        similarities = cosine_similarity(
-            [query_embedding],
-            self.embeddings
-        )[0]
+        # Compute similarities with all products, chunk by chunk
+        chunks = []
+        for start in range(0, len(embeddings), SCAN_CHUNK_SIZE):
+            if deadline is not None and deadline.expired():
+                break
+            chunks.append(cosine_similarity(
+                [query_embedding],
+                embeddings[start:start + SCAN_CHUNK_SIZE]
+            )[0])
+        
+        if not chunks:
+            return []
+        similarities = np.concatenate(chunks)
         
         # Get top-k similar products
         top_indices = np.argsort(similarities)[::-1][:top_k]
@@ -126,7 +218,7 @@ class ImageSearchEngine:
         results = []
         for idx in top_indices:
             results.append({
-                "productId": str(self.product_ids[idx]),
+                "productId": str(product_ids[idx]),
                 "similarity": float(similarities[idx])
             })
         
@@ -0,0 +1,220 @@
+"""
+Popularity ranking for cold-start recommendations.
+Keeps time-decayed order/view counters per product and precomputed
+global and per-category top lists, so popular products can be served
+without scanning the catalog.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from typing import List, Dict, Optional, Iterable
+
+
+# Relative weight of each event type
+EVENT_WEIGHTS = {
+    "view": 1.0,
+    "order": 5.0
+}
+
+# Longest list kept per ranking; matches the largest top_k the API accepts
+MAX_TOP_K = 50
+
+# Seconds an event timestamp may be ahead of this clock
+MAX_CLOCK_SKEW = 5 * 60
+
+# Oldest event accepted, in seconds
+MAX_EVENT_AGE = 90 * 24 * 3600
+
+
+def is_valid_timestamp(timestamp: float, now: Optional[float] = None) -> bool:
+    """Check an event timestamp (seconds since the epoch) is plausible."""
+    now = now if now is not None else time.time()
+    return now - MAX_EVENT_AGE <= timestamp <= now + MAX_CLOCK_SKEW
+
+
+class PopularityRanker:
+    def __init__(
+        self,
+        products: List[Dict],
+        half_life: float = 7 * 24 * 3600,
+        refresh_interval: Optional[float] = 5.0
+    ):
+        """
+        Initialize popularity ranking for a product catalog.
+
+        Args:
+            products: Catalog products
+            half_life: Seconds for an event's weight to halve
+            refresh_interval: Seconds between background top list rebuilds,
+                or None to only rebuild when refresh() is called
+        """
+        self.products = products
+        self.product_ids = {p["productId"] for p in products}
+        self.decay_rate = math.log(2) / half_life
+        self.refresh_interval = refresh_interval
+
+        # productId -> (decayed score, time the score was decayed to)
+        self.counters: Dict[str, tuple] = {}
+        self.global_top: List[Dict] = []
+        self.category_top: Dict[str, List[Dict]] = {}
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._dirty = False
+        self._stop = threading.Event()
+        self.refresh()
+
+        if refresh_interval is not None:
+            threading.Thread(
+                target=self._refresh_loop,
+                name="popularity-refresh",
+                daemon=True
+            ).start()
+
+    def record_event(
+        self,
+        product_id: str,
+        event_type: str,
+        timestamp: Optional[float] = None,
+        quantity: int = 1
+    ) -> bool:
+        """
+        Add an order or view event to a product's counter.
+
+        Args:
+            product_id: Product ID
+            event_type: "order" or "view"
+            timestamp: Event time in seconds since the epoch (default: now)
+            quantity: Number of units, for orders
+
+        Returns:
+            False if the product is not in the catalog or the timestamp
+            is out of range
+        """
+        if product_id not in self.product_ids:
+            return False
+
+        now = time.time()
+        if timestamp is None:
+            timestamp = now
+        elif not is_valid_timestamp(timestamp, now):
+            return False
+
+        # Allowed clock skew must not push counters into the future
+        timestamp = min(timestamp, now)
+        weight = EVENT_WEIGHTS[event_type] * quantity
+
+        with self._lock:
+            score, updated_at = self.counters.get(product_id, (0.0, timestamp))
+            if timestamp >= updated_at:
+                score = score * math.exp(-self.decay_rate * (timestamp - updated_at)) + weight
+                updated_at = timestamp
+            else:
+                # Late event: decay it to the counter's time instead
+                score += weight * math.exp(-self.decay_rate * (updated_at - timestamp))
+            self.counters[product_id] = (score, updated_at)
+            self._dirty = True
+
+        return True
+
+    def refresh(self):
+        """Rebuild the global and per-category top lists from the counters."""
+        with self._refresh_lock:
+            self._rebuild()
+
+    def _rebuild(self):
+        """Decay counters to now and rank the catalog by them."""
+        now = time.time()
+        with self._lock:
+            decayed = {
+                product_id: score * math.exp(-self.decay_rate * max(0.0, now - updated_at))
+                for product_id, (score, updated_at) in self.counters.items()
+            }
+            self._dirty = False
+
+        # Stable sort keeps file order for products with equal scores
+        ranked = sorted(
+            self.products,
+            key=lambda p: decayed.get(p["productId"], 0.0),
+            reverse=True
+        )
+        top_score = decayed.get(ranked[0]["productId"], 0.0) if ranked else 0.0
+
+        global_top = []
+        category_top = {}
+        for product in ranked:
+            bucket = category_top.setdefault(product["category"], [])
+            if len(bucket) >= MAX_TOP_K and len(global_top) >= MAX_TOP_K:
+                continue
+
+            score = decayed.get(product["productId"], 0.0)
+            entry = {
+                "productId": product["productId"],
+                "name": product["name"],
+                "category": product["category"],
+                "price": product["price"],
+                "score": score / top_score if top_score > 0 else 0.0
+            }
+            if len(bucket) < MAX_TOP_K:
+                bucket.append(entry)
+            if len(global_top) < MAX_TOP_K:
+                global_top.append(entry)
+
+        self.global_top = global_top
+        self.category_top = category_top
+
+    def _refresh_loop(self):
+        """Rebuild top lists in the background while new events arrive."""
+        while not self._stop.wait(self.refresh_interval):
+            if self._dirty:
+                self.refresh()
+
+    def close(self):
+        """Stop background refreshes."""
+        self._stop.set()
+
+    def get_popular(
+        self,
+        top_k: int = 10,
+        categories: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
+        """
+        Get the most popular products.
+
+        Args:
+            top_k: Number of products to return
+            categories: Prefer products from these categories, then fill
+                with globally popular products
+            exclude: Product IDs to leave out
+
+        Returns:
+            List of products with popularity scores between 0 and 1.
+            Entries are shared between calls and must not be modified.
+        """
+        global_top = self.global_top
+
+        if not categories and not exclude:
+            return global_top[:top_k]
+
+        category_top = self.category_top
+        candidates = heapq.merge(
+            *(category_top.get(c, []) for c in dict.fromkeys(categories or [])),
+            key=lambda entry: entry["score"],
+            reverse=True
+        )
+
+        results = []
+        seen = set(exclude or [])
+        for entry in itertools.chain(candidates, global_top):
+            if entry["productId"] in seen:
+                continue
+            seen.add(entry["productId"])
+            results.append(entry)
+            if len(results) == top_k:
+                break
+
+        return results
@@ -5,9 +5,15 @@ Recommends products based on category similarity and price ranges.
 
 import json
 import os
-from typing import List, Dict
+from typing import List, Dict, Optional
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+from utils.deadline import Deadline
+from models.popularity import PopularityRanker
+
+
+# Number of products scored per step; deadlines are checked between chunks
+SCAN_CHUNK_SIZE = 256
 
 
 class ProductRecommender:
@@ -17,6 +23,8 @@ class ProductRecommender:
         self.product_dict = {p["productId"]: p for p in self.products}
         self.categories = self._get_categories()
         self.price_stats = self._calculate_price_stats()
+        self.feature_matrix = self._build_feature_matrix()
+        self.popularity = PopularityRanker(self.products)
     
     def _load_products(self, products_file: str) -> List[Dict]:
         """Load products from JSON file."""
@@ -58,10 +66,36 @@ class ProductRecommender:
         # Combine category and price
         return np.append(category_vector, normalized_price)
     
+    def _build_feature_matrix(self) -> np.ndarray:
+        """Pre-compute feature vectors for all products, one row per product."""
+        if not self.products:
+            return np.zeros((0, len(self.categories) + 1))
+        return np.array([self._create_feature_vector(p) for p in self.products])
+    
+    def _scan_scores(
+        self,
+        query_vector: np.ndarray,
+        deadline: Optional[Deadline] = None
+    ) -> np.ndarray:
+        """
+        Score products against a query vector in chunks.
+        Stops early if the deadline expires, returning scores only for the
+        products scanned so far (a prefix of self.products).
+        """
+        scores = []
+        for start in range(0, len(self.products), SCAN_CHUNK_SIZE):
+            if deadline is not None and deadline.expired():
+                break
+            chunk = self.feature_matrix[start:start + SCAN_CHUNK_SIZE]
+            scores.append(cosine_similarity([query_vector], chunk)[0])
+        
+        return np.concatenate(scores) if scores else np.array([])
+    
     def recommend_for_user(
         self, 
         user_history: List[Dict], 
-        top_k: int = 10
+        top_k: int = 10,
+        deadline: Optional[Deadline] = None
     ) -> List[Dict]:
         """
         Recommend products based on user's purchase history.
@@ -69,22 +103,15 @@ class ProductRecommender:
         Args:
             user_history: List of purchased products with category and price
             top_k: Number of recommendations to return
+            deadline: Optional budget; best results so far are returned
+                when it expires
             
         Returns:
             List of recommended products with scores
         """
         if not user_history:
-            # Return top popular products (by price/availability)
-            return [
-                {
-                    "productId": p["productId"],
-                    "name": p["name"],
-                    "category": p["category"],
-                    "price": p["price"],
-                    "score": 0.5
-                }
-                for p in self.products[:top_k]
-            ]
+            # Cold start: serve precomputed most popular products
+            return self.popularity.get_popular(top_k)
         
         # Get products user has seen
         seen_ids = set(item.get("productId") for item in user_history)
@@ -97,23 +124,23 @@ class ProductRecommender:
                 history_vectors.append(self._create_feature_vector(product))
         
         if not history_vectors:
-            return self.recommend_for_user([], top_k)
+            # Unknown products: popular products from the same categories
+            return self.popularity.get_popular(
+                top_k,
+                categories=[item.get("category") for item in user_history],
+                exclude=seen_ids
+            )
         
         # Average user profile
         user_profile = np.mean(history_vectors, axis=0)
         
         # Score all unseen products
+        scores = self._scan_scores(user_profile, deadline)
         recommendations = []
-        for product in self.products:
+        for product, similarity in zip(self.products, scores):
             if product["productId"] in seen_ids:
                 continue
             
-            product_vector = self._create_feature_vector(product)
-            similarity = cosine_similarity(
-                [user_profile], 
-                [product_vector]
-            )[0][0]
-            
             recommendations.append({
                 "productId": product["productId"],
                 "name": product["name"],
@@ -129,7 +156,8 @@ class ProductRecommender:
     def recommend_similar_products(
         self, 
         product_id: str, 
-        top_k: int = 10
+        top_k: int = 10,
+        deadline: Optional[Deadline] = None
     ) -> List[Dict]:
         """
         Find products similar to the given product.
@@ -137,6 +165,8 @@ class ProductRecommender:
         Args:
             product_id: Product ID to find similar products for
             top_k: Number of recommendations to return
+            deadline: Optional budget; best results so far are returned
+                when it expires
             
         Returns:
             List of similar products with similarity scores
@@ -148,17 +178,12 @@ class ProductRecommender:
         target_vector = self._create_feature_vector(target_product)
         
         # Score all other products
+        scores = self._scan_scores(target_vector, deadline)
         similarities = []
-        for product in self.products:
+        for product, similarity in zip(self.products, scores):
             if product["productId"] == product_id:
                 continue
             
-            product_vector = self._create_feature_vector(product)
-            similarity = cosine_similarity(
-                [target_vector], 
-                [product_vector]
-            )[0][0]
-            
             similarities.append({
                 "productId": product["productId"],
                 "name": product["name"],
@@ -0,0 +1,141 @@
+"""
+Tests for deadline handling in the API endpoints.
+Endpoint coroutines are called directly, with minimal request stand-ins.
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import Response
+
+import app as app_module
+from models import recommender as recommender_module
+from models.recommender import ProductRecommender
+from utils.deadline import Deadline
+
+
+PRODUCTS_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "products.json")
+
+
+class FakeRequest:
+    """Request stand-in that reports whether the client disconnected."""
+
+    def __init__(self, disconnected: bool = False):
+        self.disconnected = disconnected
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+@pytest.fixture
+def recommender(monkeypatch):
+    monkeypatch.setattr(recommender_module, "SCAN_CHUNK_SIZE", 4)
+    recommender = ProductRecommender(PRODUCTS_FILE)
+    monkeypatch.setattr(app_module, "recommender", recommender)
+    return recommender
+
+
+def recommend(history, x_deadline_ms=None):
+    request = app_module.UserRecommendationRequest(
+        userId="user1",
+        user_history=history,
+        top_k=10
+    )
+    response = Response()
+    results = asyncio.run(app_module.recommend_for_user(
+        request, FakeRequest(), response, x_deadline_ms=x_deadline_ms
+    ))
+    return results, response
+
+
+HISTORY = [{"productId": "1", "category": "Electronics", "price": 3999}]
+
+
+def test_full_scan_is_not_flagged_partial(recommender):
+    results, response = recommend(HISTORY)
+    assert len(results) == 10
+    assert "X-Partial-Results" not in response.headers
+
+
+def test_expired_budget_flags_partial_results(recommender):
+    results, response = recommend(HISTORY, x_deadline_ms="0.000001")
+    assert results == []
+    assert response.headers["X-Partial-Results"] == "true"
+
+
+def test_partial_results_come_from_scanned_chunks(recommender, monkeypatch, countdown_deadline):
+    monkeypatch.setattr(
+        app_module.Deadline, "from_header",
+        classmethod(lambda cls, value: countdown_deadline(checks=1))
+    )
+    results, response = recommend(HISTORY, x_deadline_ms="100")
+
+    first_chunk = [p["productId"] for p in recommender.products[:4]]
+    assert results
+    assert all(r["productId"] in first_chunk for r in results)
+    assert "1" not in [r["productId"] for r in results]
+    assert response.headers["X-Partial-Results"] == "true"
+
+
+def test_disconnect_cancels_deadline():
+    deadline = Deadline()
+    response = Response()
+
+    def scan(deadline):
+        end = time.monotonic() + 5.0
+        while not deadline.expired() and time.monotonic() < end:
+            time.sleep(0.01)
+        return ["partial"]
+
+    results = asyncio.run(app_module.run_with_deadline(
+        FakeRequest(disconnected=True), response, deadline, scan
+    ))
+
+    assert deadline.cancelled
+    assert results == ["partial"]
+    assert response.headers["X-Partial-Results"] == "true"
+
+
+def test_connected_client_does_not_cancel_deadline():
+    deadline = Deadline()
+    response = Response()
+
+    results = asyncio.run(app_module.run_with_deadline(
+        FakeRequest(), response, deadline, lambda deadline: ["done"]
+    ))
+
+    assert not deadline.cancelled
+    assert results == ["done"]
+    assert "X-Partial-Results" not in response.headers
+
+
+def test_is_admin_compares_tokens(monkeypatch):
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", "secret")
+    assert app_module.is_admin("secret")
+    assert not app_module.is_admin("wrong")
+    assert not app_module.is_admin(None)
+
+
+def test_is_admin_rejects_non_ascii_token(monkeypatch):
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", "secret")
+    # Header values are decoded as latin-1, so any byte can appear
+    assert not app_module.is_admin("s\xe9cret")
+
+
+def test_is_admin_disabled_without_configured_token(monkeypatch):
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", None)
+    assert not app_module.is_admin("secret")
+
+
+def test_events_for_unknown_products_are_skipped_and_logged(recommender, capsys):
+    request = app_module.ProductEventsRequest(events=[
+        {"productId": "1", "type": "order"},
+        {"productId": "65f0c0ffee0000000000abcd", "type": "view"},
+    ])
+
+    result = asyncio.run(app_module.record_events(request))
+
+    assert result == {"recorded": 1, "skipped": 1}
+    assert "65f0c0ffee0000000000abcd" in capsys.readouterr().out
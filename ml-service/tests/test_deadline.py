@@ -0,0 +1,41 @@
+"""
+Tests for per-request deadlines.
+"""
+
+import time
+
+from utils.deadline import Deadline
+
+
+def test_from_header_missing_has_no_time_limit():
+    deadline = Deadline.from_header(None)
+    assert deadline.expires_at is None
+    assert not deadline.expired()
+
+
+def test_from_header_invalid_or_non_positive_has_no_time_limit():
+    for value in ("abc", "", "0", "-50"):
+        deadline = Deadline.from_header(value)
+        assert deadline.expires_at is None
+        assert not deadline.expired()
+
+
+def test_from_header_sets_budget_in_milliseconds():
+    before = time.monotonic()
+    deadline = Deadline.from_header("250")
+    assert before + 0.2 <= deadline.expires_at <= time.monotonic() + 0.25
+    assert not deadline.expired()
+
+
+def test_expired_trips_after_budget():
+    deadline = Deadline(0.0)
+    assert deadline.expired()
+    assert deadline.tripped
+
+
+def test_cancel_trips_deadline():
+    deadline = Deadline()
+    assert not deadline.tripped
+    deadline.cancel()
+    assert deadline.expired()
+    assert deadline.tripped
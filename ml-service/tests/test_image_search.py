@@ -0,0 +1,91 @@
+"""
+Tests for image-based product search.
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from models import image_search as image_search_module
+from models.image_search import ImageSearchEngine
+from utils.deadline import Deadline
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(image_search_module, "SCAN_CHUNK_SIZE", 2)
+
+    # Skip loading ResNet50; queries use a fixed embedding instead
+    engine = ImageSearchEngine.__new__(ImageSearchEngine)
+    engine._store_lock = threading.Lock()
+    engine.embeddings_file = "missing/image_embeddings.npy"
+    engine.product_ids_file = "missing/product_ids.npy"
+    engine._store_mtime = None
+    engine.embeddings = np.array([
+        [1.0, 0.0],
+        [0.0, 1.0],
+        [1.0, 0.1],
+        [1.0, 0.01],
+        [0.5, 0.5],
+    ])
+    engine.product_ids = np.array(["a", "b", "c", "d", "e"])
+    engine.get_image_embedding = lambda image: np.array([1.0, 0.0])
+    return engine
+
+
+def result_ids(results):
+    return [r["productId"] for r in results]
+
+
+def test_search_without_deadline_ranks_all_products(engine):
+    results = engine.search_by_image(b"image", top_k=3)
+    assert result_ids(results) == ["a", "d", "c"]
+
+
+def test_search_returns_best_of_scanned_prefix(engine, countdown_deadline):
+    # One check before inference, one per scanned chunk
+    deadline = countdown_deadline(checks=2)
+    results = engine.search_by_image(b"image", top_k=3, deadline=deadline)
+
+    assert result_ids(results) == ["a", "b"]
+    assert deadline.tripped
+
+
+def test_search_skips_inference_when_deadline_expired(engine):
+    def fail(image):
+        raise AssertionError("inference should not run")
+
+    engine.get_image_embedding = fail
+    deadline = Deadline(0.0)
+
+    assert engine.search_by_image(b"image", top_k=3, deadline=deadline) == []
+    assert deadline.tripped
+
+
+def save_store(tmp_path, embeddings, product_ids):
+    np.save(tmp_path / "product_ids.npy", np.array(product_ids))
+    np.save(tmp_path / "image_embeddings.npy", np.array(embeddings))
+
+
+def test_reloads_store_rebuilt_by_another_process(engine, tmp_path):
+    engine.embeddings_file = str(tmp_path / "image_embeddings.npy")
+    engine.product_ids_file = str(tmp_path / "product_ids.npy")
+
+    save_store(tmp_path, [[0.0, 1.0], [1.0, 0.0]], ["x", "y"])
+    results = engine.search_by_image(b"image", top_k=1)
+
+    assert result_ids(results) == ["y"]
+
+
+def test_rejects_store_with_mismatched_files(engine, tmp_path):
+    engine.embeddings_file = str(tmp_path / "image_embeddings.npy")
+    engine.product_ids_file = str(tmp_path / "product_ids.npy")
+
+    # Product IDs replaced, embeddings not yet: keep serving the old store
+    save_store(tmp_path, [[0.0, 1.0], [1.0, 0.0]], ["x", "y", "z"])
+    results = engine.search_by_image(b"image", top_k=1)
+    assert result_ids(results) == ["a"]
+
+    with pytest.raises(ValueError):
+        engine.reload_embeddings()
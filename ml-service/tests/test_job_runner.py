@@ -0,0 +1,195 @@
+"""
+Tests for the embedding build job runner, using a stand-in build script.
+"""
+
+import textwrap
+import time
+
+import pytest
+
+from utils import job_runner
+from utils.job_runner import EmbeddingJobRunner
+
+
+FAKE_BUILD = textwrap.dedent("""
+    import argparse, os, sys, time
+
+    parser = argparse.ArgumentParser()
+    for name in ("--threads", "--nice", "--embeddings-file", "--product-ids-file",
+                 "--tmp-embeddings-file", "--tmp-product-ids-file"):
+        parser.add_argument(name)
+    args = parser.parse_args()
+
+    steps = int(os.environ.get("FAKE_STEPS", "3"))
+    for i in range(steps):
+        print(f"Processing {i + 1}/{steps}: product")
+        time.sleep(float(os.environ.get("FAKE_DELAY", "0.05")))
+
+    for tmp in (args.tmp_embeddings_file, args.tmp_product_ids_file):
+        with open(tmp, "w") as f:
+            f.write("data")
+    if os.environ.get("FAKE_FAIL"):
+        sys.exit(1)
+    os.replace(args.tmp_embeddings_file, args.embeddings_file)
+    os.replace(args.tmp_product_ids_file, args.product_ids_file)
+""")
+
+
+@pytest.fixture
+def make_runner(tmp_path):
+    script = tmp_path / "fake_build.py"
+    script.write_text(FAKE_BUILD)
+
+    def make(**kwargs):
+        return EmbeddingJobRunner(
+            str(script),
+            embeddings_file=str(tmp_path / "image_embeddings.npy"),
+            product_ids_file=str(tmp_path / "product_ids.npy"),
+            lock_file=str(tmp_path / ".embedding_build.lock"),
+            status_file=str(tmp_path / ".embedding_build.json"),
+            **kwargs
+        )
+
+    return make
+
+
+def wait_for(job, timeout=10.0):
+    end = time.monotonic() + timeout
+    while job.active and time.monotonic() < end:
+        time.sleep(0.02)
+    assert not job.active
+
+
+def test_build_reports_progress_and_loads_store(make_runner, tmp_path):
+    loaded = []
+    runner = make_runner(on_complete=lambda: loaded.append(True))
+
+    job = runner.start()
+    wait_for(job)
+
+    assert job.status == "succeeded"
+    assert (job.processed, job.total) == (3, 3)
+    assert loaded == [True]
+    assert (tmp_path / "image_embeddings.npy").exists()
+
+
+def test_rejects_duplicate_build_in_same_worker(make_runner, monkeypatch):
+    monkeypatch.setenv("FAKE_DELAY", "0.5")
+    runner = make_runner()
+
+    job = runner.start()
+    with pytest.raises(RuntimeError, match="already running"):
+        runner.start()
+
+    runner.cancel(job.job_id)
+    wait_for(job)
+
+
+def test_rejects_build_running_in_another_worker(make_runner, monkeypatch):
+    monkeypatch.setenv("FAKE_DELAY", "0.5")
+    first, second = make_runner(), make_runner()
+
+    job = first.start()
+    with pytest.raises(RuntimeError, match="another worker"):
+        second.start()
+
+    first.cancel(job.job_id)
+    wait_for(job)
+    wait_for(second.start())
+
+
+def test_cancel_stops_build_and_removes_temp_files(make_runner, monkeypatch, tmp_path):
+    monkeypatch.setenv("FAKE_DELAY", "0.5")
+    loaded = []
+    runner = make_runner(on_complete=lambda: loaded.append(True))
+
+    job = runner.start()
+    runner.cancel(job.job_id)
+    wait_for(job)
+
+    assert job.status == "cancelled"
+    assert loaded == []
+    assert not list(tmp_path.glob("*.tmp.npy"))
+
+
+def test_cancel_after_build_finished_still_loads_store(make_runner):
+    loaded = []
+    runner = make_runner(on_complete=lambda: loaded.append(True))
+
+    job = runner.start()
+    job.process.wait()
+    runner.cancel(job.job_id)
+    wait_for(job)
+
+    assert job.status == "succeeded"
+    assert loaded == [True]
+
+
+def test_failed_build_removes_temp_files(make_runner, monkeypatch, tmp_path):
+    monkeypatch.setenv("FAKE_FAIL", "1")
+    runner = make_runner()
+
+    job = runner.start()
+    wait_for(job)
+
+    assert job.status == "failed"
+    assert "Processing 3/3" in job.error
+    assert not list(tmp_path.glob("*.tmp.npy"))
+
+
+def test_keeps_only_recent_finished_jobs(make_runner, monkeypatch):
+    monkeypatch.setattr(job_runner, "MAX_FINISHED_JOBS", 2)
+    monkeypatch.setenv("FAKE_STEPS", "0")
+    runner = make_runner()
+
+    jobs = []
+    for _ in range(4):
+        jobs.append(runner.start())
+        wait_for(jobs[-1])
+
+    assert runner.get(jobs[0].job_id) is None
+    assert [runner.get(job.job_id) for job in jobs[1:]] == [job.to_dict() for job in jobs[1:]]
+
+
+def test_other_workers_see_status_of_running_build(make_runner, monkeypatch):
+    monkeypatch.setenv("FAKE_DELAY", "0.5")
+    monkeypatch.setattr(job_runner, "STATUS_WRITE_INTERVAL", 0)
+    owner, other = make_runner(), make_runner()
+
+    job = owner.start()
+    status = other.get(job.job_id)
+    assert status["jobId"] == job.job_id
+    assert status["status"] == "running"
+    assert "pid" not in status
+
+    owner.cancel(job.job_id)
+    wait_for(job)
+    assert other.get(job.job_id)["status"] == "cancelled"
+    assert other.get("unknown") is None
+
+
+def test_other_workers_can_cancel_build(make_runner, monkeypatch):
+    monkeypatch.setenv("FAKE_DELAY", "0.5")
+    loaded = []
+    owner = make_runner(on_complete=lambda: loaded.append(True))
+    other = make_runner()
+
+    job = owner.start()
+    assert other.cancel(job.job_id)["jobId"] == job.job_id
+    wait_for(job)
+
+    assert job.status == "cancelled"
+    assert loaded == []
+    assert other.get(job.job_id)["status"] == "cancelled"
+
+
+def test_reports_failure_when_owner_stopped_without_result(make_runner, tmp_path):
+    runner = make_runner()
+    (tmp_path / ".embedding_build.json").write_text(
+        '{"jobId": "abc", "status": "running", "processed": 1, "total": 3, '
+        '"error": null, "startedAt": 0, "finishedAt": null, "pid": null}'
+    )
+
+    status = runner.get("abc")
+    assert status["status"] == "failed"
+    assert status["error"]
@@ -0,0 +1,144 @@
+"""
+Tests for popularity ranking used by cold-start recommendations.
+"""
+
+import time
+
+import pytest
+
+from models.popularity import (
+    PopularityRanker, EVENT_WEIGHTS, MAX_CLOCK_SKEW, MAX_EVENT_AGE
+)
+
+
+DAY = 24 * 3600
+
+PRODUCTS = [
+    {"productId": "1", "name": "Headphones", "category": "Electronics", "price": 3999},
+    {"productId": "2", "name": "Smart Watch", "category": "Electronics", "price": 5999},
+    {"productId": "3", "name": "USB-C Cable", "category": "Electronics", "price": 299},
+    {"productId": "4", "name": "T-Shirt", "category": "Clothing", "price": 499},
+    {"productId": "5", "name": "Jeans", "category": "Clothing", "price": 1999},
+    {"productId": "6", "name": "Novel", "category": "Books", "price": 399},
+]
+
+
+@pytest.fixture
+def ranker():
+    return PopularityRanker(PRODUCTS, half_life=DAY, refresh_interval=None)
+
+
+def product_ids(entries):
+    return [entry["productId"] for entry in entries]
+
+
+def test_without_events_keeps_file_order(ranker):
+    assert product_ids(ranker.get_popular(3)) == ["1", "2", "3"]
+    assert all(entry["score"] == 0.0 for entry in ranker.get_popular(6))
+
+
+def test_ranks_by_weighted_events(ranker):
+    ranker.record_event("5", "view")
+    ranker.record_event("4", "order")
+    ranker.record_event("6", "view")
+    ranker.record_event("6", "view")
+    ranker.refresh()
+
+    top = ranker.get_popular(3)
+    assert product_ids(top) == ["4", "6", "5"]
+    assert top[0]["score"] == 1.0
+    assert top[1]["score"] == pytest.approx(2 * EVENT_WEIGHTS["view"] / EVENT_WEIGHTS["order"])
+
+
+def test_quantity_scales_order_weight(ranker):
+    ranker.record_event("1", "order", quantity=3)
+    score, _ = ranker.counters["1"]
+    assert score == pytest.approx(3 * EVENT_WEIGHTS["order"])
+
+
+def test_counters_decay_with_half_life(ranker):
+    now = time.time()
+    ranker.record_event("1", "view", timestamp=now - DAY)
+    ranker.record_event("1", "view", timestamp=now)
+
+    score, updated_at = ranker.counters["1"]
+    assert score == pytest.approx(1.5, rel=1e-3)
+    assert updated_at == pytest.approx(now)
+
+
+def test_late_event_is_decayed_to_counter_time(ranker):
+    now = time.time()
+    ranker.record_event("1", "view", timestamp=now)
+    ranker.record_event("1", "view", timestamp=now - DAY)
+
+    score, updated_at = ranker.counters["1"]
+    assert score == pytest.approx(1.5, rel=1e-3)
+    assert updated_at == pytest.approx(now)
+
+
+def test_rejects_future_and_ancient_timestamps(ranker):
+    now = time.time()
+    assert not ranker.record_event("1", "view", timestamp=now * 1000)
+    assert not ranker.record_event("1", "view", timestamp=now + 2 * MAX_CLOCK_SKEW)
+    assert not ranker.record_event("1", "view", timestamp=now - 2 * MAX_EVENT_AGE)
+    assert "1" not in ranker.counters
+
+
+def test_clock_skew_is_clamped_to_now(ranker):
+    ranker.record_event("1", "view", timestamp=time.time() + MAX_CLOCK_SKEW / 2)
+    _, updated_at = ranker.counters["1"]
+    assert updated_at <= time.time()
+
+    # Later events still count in full
+    ranker.record_event("1", "order")
+    score, _ = ranker.counters["1"]
+    assert score == pytest.approx(EVENT_WEIGHTS["view"] + EVENT_WEIGHTS["order"], rel=1e-3)
+
+
+def test_skips_unknown_products(ranker):
+    assert not ranker.record_event("missing", "order")
+    assert ranker.counters == {}
+
+
+def test_get_popular_only_reads_precomputed_lists(ranker):
+    ranker.record_event("6", "order")
+    assert product_ids(ranker.get_popular(1)) == ["1"]
+
+    ranker.refresh()
+    assert product_ids(ranker.get_popular(1)) == ["6"]
+
+
+def test_prefers_categories_then_fills_globally(ranker):
+    ranker.record_event("6", "order")
+    ranker.record_event("5", "view")
+    ranker.record_event("3", "view")
+    ranker.record_event("3", "view")
+    ranker.refresh()
+
+    results = ranker.get_popular(4, categories=["Clothing", "Electronics", "Clothing"])
+    assert product_ids(results) == ["3", "5", "4", "1"]
+
+    results = ranker.get_popular(6, categories=["Clothing"])
+    assert product_ids(results) == ["5", "4", "6", "3", "1", "2"]
+
+
+def test_excludes_seen_products(ranker):
+    ranker.record_event("3", "order")
+    ranker.refresh()
+
+    results = ranker.get_popular(3, categories=["Electronics"], exclude={"3", "1"})
+    assert product_ids(results) == ["2", "4", "5"]
+
+    assert "3" not in product_ids(ranker.get_popular(6, exclude={"3"}))
+
+
+def test_background_refresh_picks_up_events():
+    ranker = PopularityRanker(PRODUCTS, refresh_interval=0.01)
+    try:
+        ranker.record_event("6", "order")
+        end = time.monotonic() + 2.0
+        while ranker.get_popular(1)[0]["productId"] != "6" and time.monotonic() < end:
+            time.sleep(0.01)
+        assert product_ids(ranker.get_popular(1)) == ["6"]
+    finally:
+        ranker.close()
@@ -0,0 +1,59 @@
+"""
+Tests for request profiling middleware.
+"""
+
+import asyncio
+
+from utils.profiler import RequestProfilingMiddleware, current_request_profile
+
+
+def run_request(headers, profiled=True):
+    """Send one request through the middleware and collect response headers."""
+    seen_profiles = []
+
+    async def app(scope, receive, send):
+        profile = current_request_profile()
+        if profile is not None and profiled:
+            profile.run(sum, range(1000))
+        seen_profiles.append(profile)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"[]"})
+
+    middleware = RequestProfilingMiddleware(app, is_authorized=lambda token: token == "secret")
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    scope = {"type": "http", "headers": headers}
+    asyncio.run(middleware(scope, receive, send))
+    return dict(messages[0]["headers"]), seen_profiles[0]
+
+
+def test_passes_through_without_profile_header():
+    headers, profile = run_request([(b"x-admin-token", b"secret")])
+    assert profile is None
+    assert b"x-profile-summary" not in headers
+
+
+def test_passes_through_without_valid_token():
+    headers, profile = run_request([(b"x-profile", b"1"), (b"x-admin-token", b"wrong")])
+    assert profile is None
+    assert b"x-profile-summary" not in headers
+
+
+def test_attaches_summary_for_admin():
+    headers, profile = run_request([(b"x-profile", b"1"), (b"x-admin-token", b"secret")])
+    assert profile is not None
+    assert b"sum" in headers[b"x-profile-summary"]
+
+
+def test_omits_summary_when_nothing_was_profiled():
+    headers, profile = run_request(
+        [(b"x-profile", b"1"), (b"x-admin-token", b"secret")], profiled=False
+    )
+    assert profile is not None
+    assert b"x-profile-summary" not in headers
@@ -0,0 +1,60 @@
+"""
+Tests for the product recommender.
+"""
+
+import json
+
+import pytest
+
+from models import recommender as recommender_module
+from models.recommender import ProductRecommender
+from utils.deadline import Deadline
+
+
+@pytest.fixture
+def recommender(tmp_path, monkeypatch):
+    monkeypatch.setattr(recommender_module, "SCAN_CHUNK_SIZE", 4)
+    products = [
+        {
+            "productId": str(i),
+            "name": f"Product {i}",
+            "category": "Electronics" if i % 2 else "Clothing",
+            "price": 100 * (i + 1)
+        }
+        for i in range(10)
+    ]
+    products_file = tmp_path / "products.json"
+    products_file.write_text(json.dumps({"products": products}))
+    return ProductRecommender(str(products_file))
+
+
+def test_scan_scores_without_deadline_scores_all_products(recommender):
+    scores = recommender._scan_scores(recommender.feature_matrix[0])
+    assert len(scores) == 10
+
+
+def test_scan_scores_returns_prefix_when_deadline_expires(recommender, countdown_deadline):
+    deadline = countdown_deadline(checks=2)
+    scores = recommender._scan_scores(recommender.feature_matrix[0], deadline)
+
+    full = recommender._scan_scores(recommender.feature_matrix[0])
+    assert len(scores) == 8
+    assert list(scores) == pytest.approx(list(full[:8]))
+    assert deadline.tripped
+
+
+def test_scan_scores_expired_before_start_scores_nothing(recommender):
+    deadline = Deadline(0.0)
+    scores = recommender._scan_scores(recommender.feature_matrix[0], deadline)
+    assert len(scores) == 0
+    assert deadline.tripped
+
+
+def test_recommend_similar_products_partial_results(recommender, countdown_deadline):
+    results = recommender.recommend_similar_products(
+        "0", top_k=10, deadline=countdown_deadline(checks=1)
+    )
+    product_ids = [r["productId"] for r in results]
+
+    # Only the first chunk was scanned, minus the target product itself
+    assert sorted(product_ids) == ["1", "2", "3"]
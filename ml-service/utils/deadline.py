@@ -0,0 +1,52 @@
+"""
+Per-request latency budgets for scoring scans.
+A Deadline expires when its time budget runs out or when it is cancelled
+(e.g. the client disconnected), so long scans can stop early.
+"""
+
+import time
+from typing import Optional
+
+
+class Deadline:
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Create a deadline.
+
+        Args:
+            timeout: Budget in seconds, or None for cancellation only
+        """
+        self.expires_at = time.monotonic() + timeout if timeout is not None else None
+        self.cancelled = False
+        self.tripped = False
+
+    @classmethod
+    def from_header(cls, value: Optional[str]) -> "Deadline":
+        """
+        Build a deadline from a millisecond budget header value.
+        Missing or invalid values give a deadline with no time limit.
+        """
+        try:
+            timeout_ms = float(value) if value else None
+        except ValueError:
+            timeout_ms = None
+
+        if timeout_ms is None or timeout_ms <= 0:
+            return cls()
+        return cls(timeout_ms / 1000.0)
+
+    def cancel(self):
+        """Cancel the deadline so the next check stops the scan."""
+        self.cancelled = True
+
+    def expired(self) -> bool:
+        """
+        Check whether work should stop.
+        Once this returns True the deadline is marked as tripped, meaning
+        the scan that checked it returned partial results.
+        """
+        if self.cancelled or (
+            self.expires_at is not None and time.monotonic() >= self.expires_at
+        ):
+            self.tripped = True
+        return self.tripped
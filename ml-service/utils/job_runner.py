@@ -0,0 +1,336 @@
+"""
+Background job runner for embedding builds.
+Runs build_embeddings.py in a separate low-priority process so rebuilds
+do not compete with live traffic, and tracks progress for status checks.
+
+Builds are shared by all workers: a lock file ensures only one runs at a
+time, and the worker that started a build writes its status to a file
+so any worker can report on it or cancel it.
+"""
+
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+PROGRESS_PATTERN = re.compile(r"^Processing (\d+)/(\d+)")
+
+# Number of output lines kept to explain a failed build
+OUTPUT_TAIL_LINES = 20
+
+# Number of finished jobs kept for status checks
+MAX_FINISHED_JOBS = 20
+
+# Minimum seconds between progress updates to the status file
+STATUS_WRITE_INTERVAL = 1.0
+
+
+def _try_lock(fd: int) -> bool:
+    """Take an exclusive non-blocking lock on an open file."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _remove_files(*paths: str):
+    """Delete files, ignoring ones that do not exist."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class EmbeddingJob:
+    def __init__(self, job_id: str):
+        """Track the state of one embedding build."""
+        self.job_id = job_id
+        self.status = "running"
+        self.processed = 0
+        self.total = 0
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self.process = None
+        self.lock_fd = None
+        self.tmp_files = ()
+
+    @property
+    def active(self) -> bool:
+        return self.status == "running"
+
+    def to_dict(self) -> Dict:
+        """Serialize job status for API responses."""
+        return {
+            "jobId": self.job_id,
+            "status": self.status,
+            "processed": self.processed,
+            "total": self.total,
+            "error": self.error,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at
+        }
+
+
+class EmbeddingJobRunner:
+    def __init__(
+        self,
+        script: str = "build_embeddings.py",
+        embeddings_file: str = "data/image_embeddings.npy",
+        product_ids_file: str = "data/product_ids.npy",
+        lock_file: str = "data/.embedding_build.lock",
+        status_file: str = "data/.embedding_build.json",
+        threads: int = 1,
+        niceness: int = 10,
+        on_complete: Optional[Callable[[], None]] = None
+    ):
+        """
+        Initialize the job runner.
+
+        Args:
+            script: Build script to run in the child process
+            embeddings_file: Where the build saves embeddings
+            product_ids_file: Where the build saves product IDs
+            lock_file: File locked while a build runs, shared by all workers
+            status_file: Status of the latest build, shared by all workers
+            threads: Maximum compute threads for the child process
+            niceness: Priority reduction for the child process (POSIX only)
+            on_complete: Called after a build finishes successfully
+        """
+        self.script = script
+        self.embeddings_file = embeddings_file
+        self.product_ids_file = product_ids_file
+        self.lock_file = lock_file
+        self.status_file = status_file
+        self.threads = threads
+        self.niceness = niceness
+        self.on_complete = on_complete
+        self.jobs: Dict[str, EmbeddingJob] = {}
+        self._lock = threading.Lock()
+
+    def _child_env(self) -> Dict[str, str]:
+        """Environment for the build process with thread pools capped."""
+        env = dict(os.environ)
+        for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            env[name] = str(self.threads)
+        return env
+
+    def _prune_jobs(self):
+        """Drop the oldest finished jobs beyond MAX_FINISHED_JOBS."""
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def _write_status(self, job: EmbeddingJob, final_status: Optional[str] = None):
+        """Publish a job's status for other workers."""
+        status = job.to_dict()
+        if final_status is not None:
+            status["status"] = final_status
+        status["pid"] = job.process.pid if job.process else None
+
+        tmp_file = f"{self.status_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(status, f)
+        os.replace(tmp_file, self.status_file)
+
+    def _read_status(self, job_id: str) -> Optional[Dict]:
+        """Read the shared status file if it describes the given job."""
+        try:
+            with open(self.status_file) as f:
+                status = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if status.get("jobId") != job_id:
+            return None
+
+        # A running status with no lock held means the owning worker died
+        if status["status"] == "running" and not self._build_running():
+            status["status"] = "failed"
+            status["error"] = "Build stopped without reporting a result"
+        return status
+
+    def _build_running(self) -> bool:
+        """Check whether any worker holds the build lock."""
+        try:
+            fd = os.open(self.lock_file, os.O_RDWR)
+        except FileNotFoundError:
+            return False
+
+        try:
+            # Closing the file releases the lock if we just took it
+            return not _try_lock(fd)
+        finally:
+            os.close(fd)
+
+    def start(self) -> EmbeddingJob:
+        """
+        Start a new embedding build.
+
+        Raises:
+            RuntimeError: If a build is already running in any worker
+        """
+        with self._lock:
+            for job in self.jobs.values():
+                if job.active:
+                    raise RuntimeError(f"Embedding build {job.job_id} is already running")
+
+            # The lock file guards against builds started by other workers
+            os.makedirs(os.path.dirname(self.lock_file) or ".", exist_ok=True)
+            lock_fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT)
+            if not _try_lock(lock_fd):
+                os.close(lock_fd)
+                raise RuntimeError("An embedding build is already running in another worker")
+
+            job = EmbeddingJob(uuid.uuid4().hex)
+            job.lock_fd = lock_fd
+            job.tmp_files = (
+                self.embeddings_file.replace(".npy", f".{job.job_id}.tmp.npy"),
+                self.product_ids_file.replace(".npy", f".{job.job_id}.tmp.npy")
+            )
+            command = [
+                sys.executable, "-u", self.script,
+                "--threads", str(self.threads),
+                "--nice", str(self.niceness),
+                "--embeddings-file", self.embeddings_file,
+                "--product-ids-file", self.product_ids_file,
+                "--tmp-embeddings-file", job.tmp_files[0],
+                "--tmp-product-ids-file", job.tmp_files[1]
+            ]
+
+            # The child inherits the locked file so the lock outlives this
+            # worker if it exits while the build is still running
+            popen_kwargs = {"pass_fds": (lock_fd,)} if fcntl is not None else {}
+            try:
+                job.process = subprocess.Popen(
+                    command,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    env=self._child_env(),
+                    **popen_kwargs
+                )
+                self._write_status(job)
+            except Exception:
+                if job.process:
+                    job.process.kill()
+                os.close(lock_fd)
+                raise
+
+            self.jobs[job.job_id] = job
+            self._prune_jobs()
+
+        threading.Thread(
+            target=self._monitor,
+            args=(job,),
+            name=f"embedding-job-{job.job_id[:8]}",
+            daemon=True
+        ).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Get the status of a job started by any worker.
+
+        Returns:
+            Job status, or None if the job is unknown
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+
+        status = self._read_status(job_id)
+        if status is not None:
+            status.pop("pid", None)
+        return status
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """
+        Cancel a running job started by any worker.
+
+        Returns:
+            Job status, or None if the job is unknown
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            if job.active:
+                job.process.terminate()
+            return job.to_dict()
+
+        status = self._read_status(job_id)
+        if status is None:
+            return None
+
+        # Only signal the recorded process while its build holds the lock
+        if status["status"] == "running" and status.get("pid"):
+            try:
+                os.kill(status["pid"], signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        status.pop("pid", None)
+        return status
+
+    def _monitor(self, job: EmbeddingJob):
+        """Follow the build process output and record its outcome."""
+        tail = deque(maxlen=OUTPUT_TAIL_LINES)
+        written_at = time.monotonic()
+        for line in job.process.stdout:
+            line = line.rstrip()
+            tail.append(line)
+            match = PROGRESS_PATTERN.match(line)
+            if match:
+                job.processed = int(match.group(1))
+                job.total = int(match.group(2))
+                if time.monotonic() - written_at >= STATUS_WRITE_INTERVAL:
+                    self._write_status(job)
+                    written_at = time.monotonic()
+
+        returncode = job.process.wait()
+
+        # A cancel only counts if the signal actually stopped the build;
+        # a build that already finished is loaded as usual
+        error = None
+        if returncode == -signal.SIGTERM:
+            status = "cancelled"
+        elif returncode != 0:
+            status = "failed"
+            error = "\n".join(tail) or f"Build exited with code {returncode}"
+        else:
+            status = "succeeded"
+            try:
+                if self.on_complete:
+                    self.on_complete()
+            except Exception as e:
+                status = "failed"
+                error = f"Could not load embeddings: {e}"
+
+        if status != "succeeded":
+            _remove_files(*job.tmp_files)
+
+        job.error = error
+        job.finished_at = time.time()
+        self._write_status(job, status)
+
+        # Release the lock once the final status is visible to other
+        # workers, and only then stop counting the job as active here
+        os.close(job.lock_fd)
+        job.status = status
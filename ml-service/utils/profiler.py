@@ -0,0 +1,166 @@
+"""
+Profiling utilities for live workers.
+Includes a sampling profiler that emits collapsed stacks (compatible with
+flamegraph.pl and speedscope) and per-request cProfile summaries.
+"""
+
+import contextvars
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Optional
+
+
+_sampling_lock = threading.Lock()
+
+_request_profile = contextvars.ContextVar("request_profile", default=None)
+
+
+def _frame_label(frame) -> str:
+    """Format a stack frame as 'function (file.py:line)'."""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(duration: float, interval: float = 0.01) -> str:
+    """
+    Sample the stacks of all other threads for a period of time.
+
+    Args:
+        duration: Seconds to sample for
+        interval: Seconds between samples
+
+    Returns:
+        Collapsed stacks, one 'thread;frame;frame count' line per stack
+
+    Raises:
+        RuntimeError: If another sampling session is already running
+    """
+    if not _sampling_lock.acquire(blocking=False):
+        raise RuntimeError("A profiling session is already running")
+
+    try:
+        own_id = threading.get_ident()
+        counts = Counter()
+        end = time.monotonic() + duration
+
+        while time.monotonic() < end:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                stack.reverse()
+                counts[";".join(stack)] += 1
+
+            time.sleep(interval)
+
+        return "\n".join(f"{stack} {count}" for stack, count in counts.most_common())
+    finally:
+        _sampling_lock.release()
+
+
+class RequestProfile:
+    def __init__(self):
+        """Collect cProfile stats for the blocking work of a single request."""
+        self.stats = None
+        self._lock = threading.Lock()
+
+    def run(self, func, *args, **kwargs):
+        """Call func under cProfile and merge its stats into this profile."""
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            with self._lock:
+                if self.stats is None:
+                    self.stats = pstats.Stats(profiler)
+                else:
+                    self.stats.add(profiler)
+
+    def summary(self, limit: int = 10) -> str:
+        """
+        Summarize the profile on a single line.
+
+        Returns:
+            The top functions by cumulative time, formatted as
+            'function (file.py:line)=12.3ms' and comma separated
+        """
+        if self.stats is None:
+            return ""
+
+        entries = sorted(
+            self.stats.stats.items(),
+            key=lambda item: item[1][3],
+            reverse=True
+        )[:limit]
+        return ", ".join(
+            f"{func} ({os.path.basename(filename)}:{line})={cumtime * 1000:.1f}ms"
+            for (filename, line, func), (_, _, _, cumtime, _) in entries
+        )
+
+
+def start_request_profile() -> RequestProfile:
+    """Start profiling the current request context."""
+    profile = RequestProfile()
+    _request_profile.set(profile)
+    return profile
+
+
+def current_request_profile() -> Optional[RequestProfile]:
+    """Get the profile for the current request, if profiling was requested."""
+    return _request_profile.get()
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, app, is_authorized: Callable[[Optional[str]], bool]):
+        """
+        ASGI middleware that profiles requests sending an X-Profile header.
+        Other requests are passed straight through to the app.
+
+        Args:
+            app: ASGI application to wrap
+            is_authorized: Checks the X-Admin-Token header value
+        """
+        self.app = app
+        self.is_authorized = is_authorized
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile_requested = False
+        token = None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                profile_requested = True
+            elif name == b"x-admin-token":
+                token = value.decode("latin-1")
+
+        if not profile_requested or not self.is_authorized(token):
+            return await self.app(scope, receive, send)
+
+        profile = start_request_profile()
+
+        async def send_with_summary(message):
+            # Only scoring work run through run_with_deadline is profiled;
+            # leave the header out when nothing was measured
+            if message["type"] == "http.response.start" and profile.stats is not None:
+                summary = profile.summary().encode("latin-1", "replace")
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-summary", summary)
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_summary)